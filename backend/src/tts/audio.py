@@ -1,9 +1,83 @@
 import numpy as np
-import librosa
+import numba
 import soundfile as sf
-from typing import Union, Tuple
+import torch
+import torchaudio
+from typing import Dict, Union, Tuple
 from pathlib import Path
 import io
+import struct
+
+# Resamplers precompute their windowed-sinc kernel, so keep one per rate pair
+_RESAMPLERS: Dict[Tuple[int, int], torchaudio.transforms.Resample] = {}
+
+def _get_resampler(orig_sr: int, target_sr: int) -> torchaudio.transforms.Resample:
+    """Get a cached resampler for the given rate pair"""
+    key = (orig_sr, target_sr)
+    resampler = _RESAMPLERS.get(key)
+    if resampler is None:
+        resampler = torchaudio.transforms.Resample(
+            orig_sr, target_sr, resampling_method="sinc_interp_kaiser"
+        )
+        _RESAMPLERS[key] = resampler
+    return resampler
+
+@numba.njit(cache=True, fastmath=True)
+def _peak_abs(x: np.ndarray) -> float:
+    """Max absolute sample value in a single pass"""
+    peak = 0.0
+    for a in x.flat:
+        if a < 0:
+            a = -a
+        if a > peak:
+            peak = a
+    return peak
+
+@numba.njit(cache=True, fastmath=True)
+def _trim_ends(x: np.ndarray, frame_len: int, hop: int, top_db: float) -> Tuple[int, int]:
+    """Sample bounds of the non-silent region, matching librosa.effects.trim"""
+    n = x.shape[0]
+    n_frames = 1 + n // hop
+    half = frame_len // 2
+    amin = 1e-10
+
+    # Mean power of centered frames over a zero-padded signal, kept as a
+    # rolling sum of squares so each sample is added and removed once
+    power = np.empty(n_frames)
+    acc = 0.0
+    lo = 0
+    hi = 0
+    for t in range(n_frames):
+        start = t * hop - half
+        new_lo = max(start, 0)
+        new_hi = min(start + frame_len, n)
+        while hi < new_hi:
+            acc += x[hi] * x[hi]
+            hi += 1
+        while lo < new_lo:
+            acc -= x[lo] * x[lo]
+            lo += 1
+        power[t] = max(acc, 0.0) / frame_len
+
+    ref = amin
+    for t in range(n_frames):
+        if power[t] > ref:
+            ref = power[t]
+    threshold = ref * 10.0 ** (-top_db / 10.0)
+
+    first = -1
+    for t in range(n_frames):
+        if max(power[t], amin) > threshold:
+            first = t
+            break
+    if first < 0:
+        return 0, 0
+    last = first
+    for t in range(n_frames - 1, first - 1, -1):
+        if max(power[t], amin) > threshold:
+            last = t
+            break
+    return first * hop, min(n, (last + 1) * hop)
 
 class AudioProcessor:
     """Audio processing utilities"""
@@ -11,8 +85,21 @@ class AudioProcessor:
     @staticmethod
     def load_audio(file_path: Union[str, Path], target_sr: int = 22050) -> np.ndarray:
         """Load audio file and resample if needed"""
-        audio, sr = librosa.load(file_path, sr=target_sr, mono=True)
-        return audio.astype(np.float32)
+        audio, sr = sf.read(str(file_path), dtype="float32", always_2d=False)
+        if audio.ndim > 1:
+            audio = AudioProcessor.to_mono(audio)
+        if sr != target_sr:
+            with torch.inference_mode():
+                audio = _get_resampler(sr, target_sr)(torch.from_numpy(audio)).numpy()
+        return audio
+    
+    @staticmethod
+    def to_mono(audio: np.ndarray) -> np.ndarray:
+        """Average (frames, channels) audio down to a single float32 channel"""
+        # A float32 mat-vec reduces, scales and casts in one BLAS pass
+        channels = audio.shape[1]
+        weights = np.full(channels, 1.0 / channels, dtype=np.float32)
+        return np.asarray(audio, dtype=np.float32) @ weights
     
     @staticmethod
     def save_audio(audio: np.ndarray, file_path: Union[str, Path], sample_rate: int = 22050) -> None:
@@ -22,6 +109,24 @@ class AudioProcessor:
     @staticmethod
     def audio_to_bytes(audio: np.ndarray, sample_rate: int = 22050, format: str = "wav") -> bytes:
         """Convert audio array to bytes"""
+        if format.lower() == "wav" and np.issubdtype(audio.dtype, np.floating):
+            # PCM16 WAV is a fixed 44-byte header followed by the raw samples.
+            # Float input is scaled by 0x7FFF and rounded to nearest, like
+            # libsndfile's lrintf conversion, with out-of-range samples clipped.
+            # Integer input keeps sf.write's pass-through handling.
+            pcm = np.rint(audio * 32767.0)
+            np.clip(pcm, -32768.0, 32767.0, out=pcm)
+            pcm = pcm.astype("<i2")
+            channels = 1 if pcm.ndim == 1 else pcm.shape[1]
+            block_align = channels * 2
+            header = struct.pack(
+                "<4sI4s4sIHHIIHH4sI",
+                b"RIFF", 36 + pcm.nbytes, b"WAVE",
+                b"fmt ", 16, 1, channels, sample_rate, sample_rate * block_align, block_align, 16,
+                b"data", pcm.nbytes,
+            )
+            return header + pcm.tobytes()
+        
         buffer = io.BytesIO()
         sf.write(buffer, audio, sample_rate, format=format.upper())
         buffer.seek(0)
@@ -30,12 +135,13 @@ class AudioProcessor:
     @staticmethod
     def normalize_audio(audio: np.ndarray, target_peak: float = 0.95) -> np.ndarray:
         """Normalize audio to target peak level"""
-        if np.max(np.abs(audio)) == 0:
+        peak = _peak_abs(audio)
+        if peak == 0.0:
             return audio
-        return audio * (target_peak / np.max(np.abs(audio)))
+        return np.multiply(audio, target_peak / peak, dtype=np.float32)
     
     @staticmethod
     def trim_silence(audio: np.ndarray, top_db: int = 20) -> np.ndarray:
         """Trim silence from audio"""
-        audio_trimmed, _ = librosa.effects.trim(audio, top_db=top_db)
-        return audio_trimmed
+        start, end = _trim_ends(audio, 2048, 512, float(top_db))
+        return audio[start:end]
@@ -1,36 +1,106 @@
 import asyncio
+import hashlib
+import os
+import threading
 import numpy as np
-from typing import List, Optional, Union, Dict, Any
+from collections import OrderedDict
+from functools import lru_cache, wraps
+from typing import Callable, List, Optional, Union, Dict, Any, Tuple
 from pathlib import Path
-import tempfile
+
+# Expandable segments keep the caching allocator from stranding fragments as
+# activation sizes vary between requests. The allocator reads this when CUDA
+# is first used, so it has to be set before any model touches the GPU.
+os.environ.setdefault("PYTORCH_CUDA_ALLOC_CONF", "expandable_segments:True")
+
 import torch
 
+from transformers.pytorch_utils import Conv1D
 from TTS.api import TTS
+from TTS.tts.layers.xtts.tokenizer import split_sentence
+from .audio import AudioProcessor
 from .engine_base import TTSEngineBase
 
+def _as_float32(audio: Union[List[float], np.ndarray]) -> np.ndarray:
+    """Convert model output to float32 without copying arrays that already are"""
+    if isinstance(audio, list):
+        # model.tts returns a list of floats; fromiter skips np.array's type inference pass
+        return np.fromiter(audio, dtype=np.float32, count=len(audio))
+    return np.asarray(audio, dtype=np.float32)
+
+def _autocast_method(method: Callable, dtype: torch.dtype) -> Callable:
+    """Run a bound module method under CUDA autocast, returning float32 activations"""
+    @wraps(method)
+    def wrapper(*args, **kwargs):
+        with torch.autocast("cuda", dtype=dtype):
+            out = method(*args, **kwargs)
+        # Modules outside the GPT and .numpy() can't take bf16/fp16 tensors
+        if torch.is_tensor(out) and out.is_floating_point():
+            return out.float()
+        return out
+    return wrapper
+
+def _conv1d_to_linear(module: torch.nn.Module) -> None:
+    """Swap HF GPT2 Conv1D layers for equivalent nn.Linear ones, in place"""
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            # Conv1D stores its weight as (in, out); Linear wants (out, in)
+            linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+            linear.weight.data = child.weight.data.t().contiguous()
+            linear.bias.data = child.bias.data
+            setattr(module, name, linear)
+        else:
+            _conv1d_to_linear(child)
+
+@lru_cache(maxsize=1)
+def _detect_device() -> str:
+    """Probe the best available device once per process"""
+    # Skip the CUDA probe (and context creation) on CPU-only wheels or
+    # when GPUs are explicitly hidden from this process
+    if torch.cuda._is_compiled() and os.environ.get("CUDA_VISIBLE_DEVICES") != "":
+        if torch.cuda.is_available():
+            return "cuda"
+    if hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
+        return "mps"
+    return "cpu"
+
 class CoquiXTTSEngine(TTSEngineBase):
     """Coqui XTTS-v2 engine implementation"""
     
-    SUPPORTED_LANGUAGES = [
+    SUPPORTED_LANGUAGES_TUPLE = (
         "en", "es", "fr", "de", "it", "pt", "pl", "tr", 
         "ru", "nl", "cs", "ar", "zh-cn", "ja", "hu", "ko"
-    ]
+    )
+    SUPPORTED_LANGUAGES = frozenset(SUPPORTED_LANGUAGES_TUPLE)
+    UNSUPPORTED_LANGUAGE_MESSAGE = (
+        "Language '{}' not supported. Available: " + str(list(SUPPORTED_LANGUAGES_TUPLE))
+    )
+    
+    # Sample rate assumed for numpy speaker references
+    SPEAKER_WAV_SAMPLE_RATE = 22050
     
     def __init__(self, config: Dict[str, Any]):
         super().__init__(config)
         self.model_name = config.get("model_path", "tts_models/multilingual/multi-dataset/xtts_v2")
         self.device = self._get_device()
+        # Conditioning latents per reference audio digest, in LRU order
+        self._latent_cache: "OrderedDict[bytes, Tuple[torch.Tensor, torch.Tensor]]" = OrderedDict()
+        self._latent_cache_size = config.get("latent_cache_size", 16)
+        # Guards the latent cache when inference_workers > 1
+        self._latent_cache_lock = threading.Lock()
+        # Synthesized audio per (language, text + speaker digest), in LRU order
+        self._output_cache: "OrderedDict[Tuple[str, bytes], np.ndarray]" = OrderedDict()
+        self._output_cache_size = config.get("cache_size", 128)
+        # Captured vocoder graphs as (frames, graph, static latents, static speaker, static output)
+        self._vocoder_graphs: List[Tuple[int, Any, torch.Tensor, torch.Tensor, torch.Tensor]] = []
+        self._vocoder_eager_forward: Optional[Callable] = None
+        self._vocoder_graph_lock = threading.Lock()
         
     def _get_device(self) -> str:
         """Determine the best available device"""
         device = self.config.get("device", "auto")
         if device == "auto":
-            if torch.cuda.is_available():
-                return "cuda"
-            elif hasattr(torch.backends, 'mps') and torch.backends.mps.is_available():
-                return "mps"
-            else:
-                return "cpu"
+            return _detect_device()
         return device
     
     async def load_model(self) -> None:
@@ -39,16 +109,285 @@ class CoquiXTTSEngine(TTSEngineBase):
             # Run in thread pool to avoid blocking
             loop = asyncio.get_event_loop()
             self.model = await loop.run_in_executor(
-                None, 
+                self._executor, 
                 lambda: TTS(self.model_name).to(self.device)
             )
+            await loop.run_in_executor(self._executor, self._apply_precision)
+            if self.device == "cpu":
+                await loop.run_in_executor(self._executor, self._configure_cpu)
+            # Drop the checkpoint dict and load-time CUDA scratch before serving
+            await loop.run_in_executor(self._executor, self._release_memory)
+            if self.device == "cuda":
+                if self.config.get("cuda_graph_vocoder", False):
+                    try:
+                        await loop.run_in_executor(self._executor, self._capture_vocoder_graphs)
+                    except Exception as e:
+                        self._vocoder_graphs = []
+                        print(f"⚠️ Vocoder CUDA graph capture failed, using eager mode: {e}")
             self.is_loaded = True
+            if self.config.get("warmup", True):
+                try:
+                    await loop.run_in_executor(self._executor, self._warmup)
+                except Exception as e:
+                    print(f"⚠️ Coqui XTTS warmup failed: {e}")
             print(f"✅ Loaded Coqui XTTS model on {self.device}")
             
         except Exception as e:
             print(f"❌ Failed to load Coqui XTTS model: {e}")
             raise
     
+    def _apply_precision(self) -> None:
+        """Lower model precision: BF16/FP16 GPT decoder on CUDA, dynamic int8 on CPU"""
+        if self.config.get("precision", "auto") == "fp32":
+            return
+        tts_model = self.model.synthesizer.tts_model
+        if self.device == "cuda":
+            dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+            # Only the GPT runs in reduced precision. Autocast is scoped to the
+            # entry points Xtts and this engine call, so the speaker encoder
+            # and HiFi-GAN vocoder stay in float32.
+            gpt = tts_model.gpt
+            gpt.to(dtype=dtype)
+            for name in ("forward", "generate", "get_style_emb"):
+                setattr(gpt, name, _autocast_method(getattr(gpt, name), dtype))
+        elif self.device == "cpu":
+            # Quantize only the GPT2 transformer stack, which dominates CPU time.
+            # Its attention/MLP projections are HF Conv1D layers, so convert
+            # them to nn.Linear first. The conditioning, speaker-encoder and
+            # vocoder weights stay fp32 so cloned voices are unchanged.
+            transformer = tts_model.gpt.gpt
+            _conv1d_to_linear(transformer)
+            torch.ao.quantization.quantize_dynamic(
+                transformer, {torch.nn.Linear}, dtype=torch.qint8, inplace=True
+            )
+    
+    def _configure_cpu(self) -> None:
+        """Size torch thread pools for CPU inference and optionally compile the vocoder"""
+        # Leave headroom for the executor and event loop threads
+        torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+        try:
+            torch.set_num_interop_threads(1)
+        except RuntimeError:
+            # Only settable before any inter-op work has run in this process
+            pass
+        
+        if self.config.get("compile", False) and hasattr(torch, "compile"):
+            # Only modules invoked through forward() benefit; the GPT decoder
+            # is driven through generate() and stays eager
+            tts_model = self.model.synthesizer.tts_model
+            decoder = tts_model.hifigan_decoder
+            try:
+                compiled = torch.compile(decoder, backend="inductor", dynamic=True)
+                # Inductor compiles lazily, so force it now to surface toolchain
+                # or Dynamo failures here rather than in the first request
+                with torch.inference_mode():
+                    compiled(
+                        torch.zeros(1, 32, tts_model.args.decoder_input_dim),
+                        g=torch.zeros(1, tts_model.args.d_vector_dim, 1)
+                    )
+                tts_model.hifigan_decoder = compiled
+            except Exception as e:
+                tts_model.hifigan_decoder = decoder
+                print(f"⚠️ torch.compile failed, using eager mode: {e}")
+    
+    def _tts(self, **kwargs) -> List[float]:
+        """Run model.tts without autograd bookkeeping"""
+        # Grad mode is thread-local, so this must be entered on the worker thread
+        with torch.inference_mode():
+            return self.model.tts(**kwargs)
+    
+    def _capture_vocoder_graphs(self) -> None:
+        """Capture the HiFi-GAN decoder into CUDA graphs, one per latent-length bucket"""
+        tts_model = self.model.synthesizer.tts_model
+        decoder = tts_model.hifigan_decoder
+        eager_forward = decoder.forward
+        graphs = []
+        with torch.inference_mode():
+            for frames in sorted(self.config.get("vocoder_graph_frames", [64, 128, 256])):
+                static_latents = torch.zeros(1, frames, tts_model.args.decoder_input_dim, device="cuda")
+                static_g = torch.zeros(1, tts_model.args.d_vector_dim, 1, device="cuda")
+                
+                # Warm up on a side stream so one-time setup isn't recorded into the graph
+                stream = torch.cuda.Stream()
+                stream.wait_stream(torch.cuda.current_stream())
+                with torch.cuda.stream(stream):
+                    for _ in range(3):
+                        eager_forward(static_latents, g=static_g)
+                torch.cuda.current_stream().wait_stream(stream)
+                
+                graph = torch.cuda.CUDAGraph()
+                with torch.cuda.graph(graph):
+                    static_out = eager_forward(static_latents, g=static_g)
+                graphs.append((frames, graph, static_latents, static_g, static_out))
+        self._vocoder_graphs = graphs
+        self._vocoder_eager_forward = eager_forward
+        # Dispatch on the decoder itself so model.tts and Xtts.inference replay
+        # the graphs without any change to their call paths
+        decoder.forward = self._vocode
+    
+    def _vocode(self, latents: torch.Tensor, g: Optional[torch.Tensor] = None) -> torch.Tensor:
+        """HiFi-GAN decoder forward that replays a captured graph when the latents fit one"""
+        frames = latents.shape[1]
+        if latents.shape[0] == 1 and g is not None:
+            for bucket, graph, static_latents, static_g, static_out in self._vocoder_graphs:
+                if frames <= bucket:
+                    # Static buffers are shared, so only one replay may be in flight
+                    with self._vocoder_graph_lock:
+                        static_latents.zero_()
+                        static_latents[:, :frames].copy_(latents)
+                        static_g.copy_(g)
+                        graph.replay()
+                        return static_out[..., : static_out.shape[-1] * frames // bucket].clone()
+        return self._vocoder_eager_forward(latents, g=g)
+    
+    def _warmup(self) -> None:
+        """Run a throwaway synthesis so kernel selection and allocator growth happen at load"""
+        # XTTS needs a reference voice; low-level noise exercises the same path
+        sr = self.SPEAKER_WAV_SAMPLE_RATE
+        reference = np.random.default_rng(0).standard_normal(3 * sr).astype(np.float32) * 0.01
+        self._clone("warmup.", "en", reference)
+        with self._latent_cache_lock:
+            self._latent_cache.clear()
+    
+    def _conditioning_latents(self, speaker_wav: np.ndarray) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Get XTTS conditioning latents for an in-memory reference, reusing cached ones"""
+        speaker_wav = np.ascontiguousarray(speaker_wav, dtype=np.float32)
+        if speaker_wav.ndim > 1:
+            speaker_wav = AudioProcessor.to_mono(speaker_wav)
+        
+        key = hashlib.blake2b(speaker_wav.tobytes(), digest_size=16).digest()
+        with self._latent_cache_lock:
+            latents = self._latent_cache.get(key)
+            if latents is not None:
+                self._latent_cache.move_to_end(key)
+                return latents
+        
+        # Same steps as Xtts.get_conditioning_latents, minus reading from disk
+        tts_model = self.model.synthesizer.tts_model
+        sr = self.SPEAKER_WAV_SAMPLE_RATE
+        audio = torch.from_numpy(speaker_wav).clamp(-1.0, 1.0).unsqueeze(0)
+        audio = audio[:, : sr * tts_model.config.max_ref_len]
+        if self.device == "cuda":
+            # Stage through pinned memory so the upload is an async DMA
+            pinned = torch.empty(audio.shape, dtype=torch.float32, pin_memory=True)
+            pinned.copy_(audio)
+            audio = pinned.to(self.device, non_blocking=True)
+        else:
+            audio = audio.to(self.device)
+        gpt_cond_latent = tts_model.get_gpt_cond_latents(
+            audio,
+            sr,
+            length=tts_model.config.gpt_cond_len,
+            chunk_length=tts_model.config.gpt_cond_chunk_len
+        )
+        speaker_embedding = tts_model.get_speaker_embedding(audio, sr)
+        
+        latents = (gpt_cond_latent, speaker_embedding)
+        with self._latent_cache_lock:
+            self._latent_cache[key] = latents
+            if len(self._latent_cache) > self._latent_cache_size:
+                self._latent_cache.popitem(last=False)
+        return latents
+    
+    def _clone(self, text: str, language: str, speaker_wav: np.ndarray) -> np.ndarray:
+        """Synthesize with an in-memory reference via the XTTS inference API"""
+        tts_model = self.model.synthesizer.tts_model
+        with torch.inference_mode():
+            gpt_cond_latent, speaker_embedding = self._conditioning_latents(speaker_wav)
+            outputs = tts_model.inference(
+                text,
+                language,
+                gpt_cond_latent,
+                speaker_embedding,
+                temperature=tts_model.config.temperature,
+                length_penalty=tts_model.config.length_penalty,
+                repetition_penalty=tts_model.config.repetition_penalty,
+                top_k=tts_model.config.top_k,
+                top_p=tts_model.config.top_p,
+                enable_text_splitting=True
+            )
+        return outputs["wav"]
+    
+    def _synthesize_texts(
+        self,
+        texts: List[str],
+        language: str,
+        speaker_wav: np.ndarray
+    ) -> np.ndarray:
+        """Generate GPT latents per sentence, then vocode them all in one pass"""
+        tts_model = self.model.synthesizer.tts_model
+        cfg = tts_model.config
+        language = language.split("-")[0]
+        # Split the way Xtts.inference does, honouring per-language prompt limits
+        sentences = [
+            sentence
+            for text in texts
+            for sentence in split_sentence(text, language, tts_model.tokenizer.char_limits[language])
+        ]
+        
+        with torch.inference_mode():
+            gpt_cond_latent, speaker_embedding = self._conditioning_latents(speaker_wav)
+            gpt_latents = []
+            # Mirrors the per-sentence loop in Xtts.inference, but defers the vocoder
+            for sentence in sentences:
+                text_tokens = torch.IntTensor(
+                    tts_model.tokenizer.encode(sentence.strip().lower(), lang=language)
+                ).unsqueeze(0).to(self.device)
+                max_tokens = tts_model.args.gpt_max_text_tokens
+                if text_tokens.shape[-1] >= max_tokens:
+                    raise ValueError(f"Text too long. XTTS can only generate text with fewer than {max_tokens} tokens per sentence.")
+                gpt_codes = tts_model.gpt.generate(
+                    cond_latents=gpt_cond_latent,
+                    text_inputs=text_tokens,
+                    input_tokens=None,
+                    do_sample=True,
+                    top_p=cfg.top_p,
+                    top_k=cfg.top_k,
+                    temperature=cfg.temperature,
+                    num_return_sequences=tts_model.gpt_batch_size,
+                    num_beams=1,
+                    length_penalty=cfg.length_penalty,
+                    repetition_penalty=cfg.repetition_penalty,
+                    output_attentions=False
+                )
+                expected_output_len = torch.tensor(
+                    [gpt_codes.shape[-1] * tts_model.gpt.code_stride_len], device=self.device
+                )
+                text_len = torch.tensor([text_tokens.shape[-1]], device=self.device)
+                gpt_latents.append(tts_model.gpt(
+                    text_tokens,
+                    text_len,
+                    gpt_codes,
+                    expected_output_len,
+                    cond_latents=gpt_cond_latent,
+                    return_attentions=False,
+                    return_latent=True
+                ))
+            
+            wav = tts_model.hifigan_decoder(torch.cat(gpt_latents, dim=1), g=speaker_embedding)
+        return wav.squeeze().float().cpu().numpy()
+    
+    def _output_cache_key(
+        self,
+        text: str,
+        language: str,
+        speaker_wav: Optional[Union[str, Path, np.ndarray]]
+    ) -> Tuple[str, bytes]:
+        """Cache key for a synthesis request"""
+        encoded = text.encode()
+        # Length-prefix the text so text/speaker boundaries can't be confused
+        digest = hashlib.blake2b(len(encoded).to_bytes(8, "little"), digest_size=16)
+        digest.update(encoded)
+        if isinstance(speaker_wav, np.ndarray):
+            # Same bytes in a different layout (e.g. stereo vs. mono) is a different voice
+            digest.update(f"{speaker_wav.dtype.str}{speaker_wav.shape}".encode())
+            digest.update(np.ascontiguousarray(speaker_wav))
+        elif speaker_wav is not None:
+            # Include size and mtime so a reference rewritten in place misses the cache
+            stat = os.stat(speaker_wav)
+            digest.update(f"{speaker_wav}|{stat.st_size}|{stat.st_mtime_ns}".encode())
+        return language, digest.digest()
+    
     async def synthesize(
         self, 
         text: str, 
@@ -63,59 +402,126 @@ class CoquiXTTSEngine(TTSEngineBase):
             
         # Validate language
         if language not in self.SUPPORTED_LANGUAGES:
-            raise ValueError(f"Language '{language}' not supported. Available: {self.SUPPORTED_LANGUAGES}")
+            raise ValueError(self.UNSUPPORTED_LANGUAGE_MESSAGE.format(language))
         
         # Validate text length
         max_length = kwargs.get("max_length", 500)
         if len(text) > max_length:
             raise ValueError(f"Text too long. Maximum {max_length} characters allowed.")
         
+        # Serve repeated requests from the output cache
+        if self._output_cache_size > 0:
+            cache_key = self._output_cache_key(text, language, speaker_wav)
+            cached = self._output_cache.get(cache_key)
+            if cached is not None:
+                self._output_cache.move_to_end(cache_key)
+                return cached.copy()
+        
         try:
             loop = asyncio.get_event_loop()
             
-            # Handle speaker reference audio
-            speaker_wav_path = None
-            if speaker_wav is not None:
-                if isinstance(speaker_wav, (str, Path)):
-                    speaker_wav_path = str(speaker_wav)
-                else:
-                    # Save numpy array to temp file
-                    with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as f:
-                        import soundfile as sf
-                        sf.write(f.name, speaker_wav, 22050)
-                        speaker_wav_path = f.name
-            
             # Synthesize in thread pool
-            if speaker_wav_path:
-                # Voice cloning mode
+            if isinstance(speaker_wav, np.ndarray):
+                # Voice cloning from in-memory audio
                 audio = await loop.run_in_executor(
-                    None,
-                    lambda: self.model.tts(
+                    self._executor,
+                    lambda: self._clone(text, language, speaker_wav)
+                )
+            elif speaker_wav is not None:
+                # Voice cloning from a reference file
+                audio = await loop.run_in_executor(
+                    self._executor,
+                    lambda: self._tts(
                         text=text,
-                        speaker_wav=speaker_wav_path,
+                        speaker_wav=str(speaker_wav),
                         language=language
                     )
                 )
             else:
                 # Default speaker mode
                 audio = await loop.run_in_executor(
-                    None,
-                    lambda: self.model.tts(
+                    self._executor,
+                    lambda: self._tts(
                         text=text,
                         language=language
                     )
                 )
             
-            # Clean up temp file
-            if speaker_wav_path and isinstance(speaker_wav, np.ndarray):
-                Path(speaker_wav_path).unlink(missing_ok=True)
-            
-            return np.array(audio, dtype=np.float32)
+            audio = _as_float32(audio)
+            if self._output_cache_size > 0:
+                # Keep our own copy so callers can't mutate the cached audio
+                self._output_cache[cache_key] = audio.copy()
+                if len(self._output_cache) > self._output_cache_size:
+                    self._output_cache.popitem(last=False)
+            return audio
             
         except Exception as e:
             print(f"❌ Synthesis failed: {e}")
             raise
     
+    async def synthesize_batch(
+        self,
+        texts: List[str],
+        language: str = "en",
+        speaker_wav: Optional[Union[str, Path, np.ndarray]] = None,
+        **kwargs
+    ) -> np.ndarray:
+        """Synthesize several texts as one utterance, sharing speaker latents and the vocoder pass"""
+        
+        if not self.is_loaded:
+            await self.load_model()
+            
+        # Validate language
+        if language not in self.SUPPORTED_LANGUAGES:
+            raise ValueError(self.UNSUPPORTED_LANGUAGE_MESSAGE.format(language))
+        
+        # Validate text length
+        max_length = kwargs.get("max_length", 500)
+        if any(len(text) > max_length for text in texts):
+            raise ValueError(f"Text too long. Maximum {max_length} characters allowed.")
+        
+        if speaker_wav is None:
+            raise ValueError("Batched synthesis requires a speaker reference.")
+        
+        texts = [text.strip() for text in texts if text.strip()]
+        if not texts:
+            return np.zeros(0, dtype=np.float32)
+        
+        try:
+            loop = asyncio.get_event_loop()
+            
+            if not isinstance(speaker_wav, np.ndarray):
+                speaker_wav = await loop.run_in_executor(
+                    self._executor,
+                    lambda: AudioProcessor.load_audio(speaker_wav, self.SPEAKER_WAV_SAMPLE_RATE)
+                )
+            
+            audio = await loop.run_in_executor(
+                self._executor,
+                lambda: self._synthesize_texts(texts, language, speaker_wav)
+            )
+            
+            return _as_float32(audio)
+            
+        except Exception as e:
+            print(f"❌ Batched synthesis failed: {e}")
+            raise
+    
+    def _teardown(self) -> None:
+        """Drop speaker latents and vocoder graphs along with the model"""
+        with self._latent_cache_lock:
+            self._latent_cache.clear()
+        self._vocoder_graphs = []
+        self._vocoder_eager_forward = None
+        # Break the TTS -> Synthesizer -> model references so GC can free the weights
+        self.model.synthesizer = None
+        super()._teardown()
+    
+    async def unload_model(self) -> None:
+        """Unload the model and drop cached audio"""
+        self._output_cache.clear()
+        await super().unload_model()
+    
     async def get_supported_languages(self) -> List[str]:
         """Get supported language codes"""
-        return self.SUPPORTED_LANGUAGES.copy()
+        return list(self.SUPPORTED_LANGUAGES_TUPLE)
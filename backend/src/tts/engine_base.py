@@ -1,6 +1,10 @@
+import asyncio
+import gc
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
 from typing import Union, Optional, Dict, Any, List
 import numpy as np
+import torch
 from pathlib import Path
 
 class TTSEngineBase(ABC):
@@ -10,6 +14,32 @@ class TTSEngineBase(ABC):
         self.config = config
         self.model = None
         self.is_loaded = False
+        self._executor = self._create_executor()
+        
+    def _create_executor(self) -> ThreadPoolExecutor:
+        """Create the pool that model work runs on"""
+        # A single worker by default, so concurrent requests queue up instead
+        # of all allocating activations on the device at once
+        return ThreadPoolExecutor(
+            max_workers=self.config.get("inference_workers", 1),
+            thread_name_prefix="tts"
+        )
+        
+    def _release_memory(self) -> None:
+        """Collect garbage and return cached device memory; blocking, so run on the executor"""
+        # Collect reference cycles still holding tensors before releasing memory
+        gc.collect()
+        if torch.cuda.is_initialized():
+            # Hand cached blocks back to the driver instead of holding them
+            torch.cuda.synchronize()
+            torch.cuda.empty_cache()
+            torch.cuda.ipc_collect()
+        
+    def _teardown(self) -> None:
+        """Drop the model and release its memory; runs on the executor"""
+        self.model = None
+        self.is_loaded = False
+        self._release_memory()
         
     @abstractmethod
     async def load_model(self) -> None:
@@ -46,9 +76,12 @@ class TTSEngineBase(ABC):
     async def unload_model(self) -> None:
         """Unload the model to free memory"""
         if self.model is not None:
-            del self.model
-            self.model = None
-            self.is_loaded = False
+            loop = asyncio.get_event_loop()
+            # Queue the teardown behind pending work on the current pool so it
+            # never runs alongside a job that still uses the model
+            await loop.run_in_executor(self._executor, self._teardown)
+            self._executor.shutdown(wait=False)
+            self._executor = self._create_executor()
             
     async def health_check(self) -> Dict[str, Any]:
         """Check engine health status"""
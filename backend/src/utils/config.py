@@ -1,9 +1,16 @@
 from pydantic_settings import BaseSettings
 from pydantic import Field
+from functools import lru_cache
 from typing import Dict, List, Optional
+import os
 import yaml
 from pathlib import Path
 
+try:
+    from yaml import CSafeLoader as _YAMLLoader
+except ImportError:  # PyYAML built without libyaml
+    from yaml import SafeLoader as _YAMLLoader
+
 class TTSEngineConfig(BaseSettings):
     name: str
     model_path: str
@@ -29,10 +36,20 @@ class AppConfig(BaseSettings):
         env_file = ".env"
         env_nested_delimiter = "__"
 
+@lru_cache(maxsize=8)
+def _load_config_file(config_path: str, mtime: float) -> AppConfig:
+    """Parse a config file; mtime is part of the cache key so edits are picked up"""
+    with open(config_path, 'r') as f:
+        config_data = yaml.load(f, Loader=_YAMLLoader)
+    return AppConfig(**config_data)
+
+@lru_cache(maxsize=1)
+def _default_config() -> AppConfig:
+    """Build the environment-only config once"""
+    return AppConfig()
+
 def load_config(config_path: Optional[str] = None) -> AppConfig:
     """Load configuration from file and environment variables"""
     if config_path and Path(config_path).exists():
-        with open(config_path, 'r') as f:
-            config_data = yaml.safe_load(f)
-        return AppConfig(**config_data)
-    return AppConfig()
+        return _load_config_file(config_path, os.path.getmtime(config_path))
+    return _default_config()